@@ -2,6 +2,7 @@ import streamlit as st
 import pandas as pd
 import sqlite3
 import os
+import time
 
 # --- CONSTANTES PARA NOMES DE COLUNAS ---
 CSV_CATEGORY = 'category'
@@ -193,8 +194,15 @@ def sincronizar_dataframe_editado(df_editado, nome_banco_sqlite=NOME_BANCO_SQLIT
     return sucesso_geral, messages
 
 # --- CARREGAMENTO DE DADOS DO SQLITE ---
-@st.cache_data
-def carregar_dados():
+# cache_resource mantém um único DataFrame por processo, compartilhado por todas as sessões
+# (cache_data devolveria uma cópia desserializada para cada chamada). Só carregar_dados() o acessa.
+# A versão (instante da carga) muda sempre que o cache é limpo e os dados são relidos.
+@st.cache_resource
+def _carregar_dados_cache():
+    df_resultado, messages = _ler_dados_do_sqlite()
+    return df_resultado, messages, time.time_ns()
+
+def _ler_dados_do_sqlite():
     script_dir = os.path.dirname(os.path.abspath(__file__))
     caminho_banco_sqlite = os.path.join(script_dir, NOME_BANCO_SQLITE)
     conn = None
@@ -237,6 +245,19 @@ def carregar_dados():
         if conn:
             conn.close()
 
+def carregar_dados():
+    """Devolve uma view rasa do DataFrame compartilhado (nunca o objeto em cache) e a versão dos dados.
+
+    Com o Copy-on-Write do pandas 3, a view não duplica os dados, e qualquer escrita
+    nela copia só a coluna alterada, sem afetar as outras sessões.
+    """
+    df_cache, messages, versao = _carregar_dados_cache()
+    df_sessao = df_cache.copy(deep=False) if df_cache is not None else None
+    return df_sessao, list(messages), versao
+
+def limpar_cache_dados():
+    _carregar_dados_cache.clear()
+
 # --- FUNÇÕES DE LOGIN ---
 def verificar_login(username, password):
     